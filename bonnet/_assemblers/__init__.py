@@ -1,7 +1,49 @@
-from typing import Protocol, Union
+from typing import List, Protocol
 
-from .._models import Entity, ContextTree, SearchResult, Attribute, File
-from typing import List
+from .._models import ContextTree, Attribute, File
+
+# Precomputed indentation strings; deeper levels fall back to multiplication
+_INDENT_CACHE_SIZE = 64
+_INDENTS = tuple("  " * i for i in range(_INDENT_CACHE_SIZE))
+
+# Single-pass XML escaping tables: text nodes only need &, < and >, while
+# attribute values are quoted and so also need "
+_XML_TEXT_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+_XML_ATTR_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+
+def _esc(value: str) -> str:
+    """Escape a value for use as XML text content."""
+    return value.translate(_XML_TEXT_ESCAPES)
+
+
+def _esc_attr(value: str) -> str:
+    """Escape a value for use inside a double-quoted XML attribute."""
+    return value.translate(_XML_ATTR_ESCAPES)
+
+
+def _assemble_attribute(attribute: Attribute, indent: str, out: List[str]) -> None:
+    """Append the XML line for an attribute."""
+    out.append(f"{indent}<attribute id=\"{_esc_attr(attribute.id)}\" type=\"{_esc_attr(attribute.type)}\">{_esc(attribute.subject)}:{_esc(attribute.detail)}</attribute>")
+
+
+def _assemble_file(file: File, indent: str, out: List[str]) -> None:
+    """Append the XML lines for a file, with its description and content when present."""
+    if file.include_content and file.content:
+        # File with content - include both description and content
+        out.append(f"{indent}<file id=\"{_esc_attr(file.id)}\" path=\"{_esc_attr(file.file_path)}\">")
+        if file.description:
+            out.append(f"{indent}  <description>{_esc(file.description)}</description>")
+        out.append(f"{indent}  <content>{_esc(file.content)}</content>")
+        out.append(f"{indent}</file>")
+    elif file.description:
+        # File with description only
+        out.append(f"{indent}<file id=\"{_esc_attr(file.id)}\" path=\"{_esc_attr(file.file_path)}\">")
+        out.append(f"{indent}  <description>{_esc(file.description)}</description>")
+        out.append(f"{indent}</file>")
+    else:
+        # File with no description or content
+        out.append(f"{indent}<file id=\"{_esc_attr(file.id)}\" path=\"{_esc_attr(file.file_path)}\"></file>")
 
 
 class Assembler(Protocol):
@@ -16,64 +58,41 @@ def xml_assembler() -> Assembler:
     def assemble(context: ContextTree) -> str:
         """Assemble a ContextTree into XML format, following edges to render actual node types."""
         
-        def assemble_attribute(attribute: Attribute) -> str:
-            return f"<attribute id=\"{attribute.id}\" type=\"{attribute.type}\">{attribute.subject}:{attribute.detail}</attribute>"
-        
-        def assemble_file(file: File, indent: str) -> str:
-            if file.include_content and file.content:
-                # File with content - include both description and content
-                lines = [f"<file id=\"{file.id}\" path=\"{file.file_path}\">"]
-                if file.description:
-                    lines.append(f"{indent}  <description>{file.description}</description>")
-                lines.append(f"{indent}  <content>{file.content}</content>")
-                lines.append(f"{indent}</file>")
-                return "\n".join(lines)
-            elif file.description:
-                # File with description only
-                return f"<file id=\"{file.id}\" path=\"{file.file_path}\">\n{indent}  <description>{file.description}</description>\n{indent}</file>"
-            else:
-                # File with no description or content
-                return f"<file id=\"{file.id}\" path=\"{file.file_path}\"></file>"
-        
         lines = ["<context>"]
         
-        # Recursively assemble the tree structure
-        def assemble_tree(tree: ContextTree, indent_level: int = 1) -> List[str]:
-            result_lines = []
-            indent = "  " * indent_level
+        # Walk the tree depth-first with an explicit stack. Each entry is
+        # (tree, indent_level, closing); an entity pushes its closing marker
+        # before its children so the </entity> is emitted after them.
+        stack = [(context, 1, False)]
+        while stack:
+            tree, indent_level, closing = stack.pop()
+            indent = _INDENTS[indent_level] if indent_level < _INDENT_CACHE_SIZE else "  " * indent_level
+            
+            if closing:
+                lines.append(f"{indent}</entity>")
+                continue
             
             # Render based on the type
             if tree.type == 'entity' and tree.data:
                 entity = tree.data
-                short_name_attr = f" short_name=\"{entity.short_name}\"" if entity.short_name else ""
-                result_lines.append(f"{indent}<entity id=\"{entity.id}\" name=\"{entity.name}\"{short_name_attr}>")
+                if entity.short_name:
+                    lines.append(f"{indent}<entity id=\"{_esc_attr(entity.id)}\" name=\"{_esc_attr(entity.name)}\" short_name=\"{_esc_attr(entity.short_name)}\">")
+                else:
+                    lines.append(f"{indent}<entity id=\"{_esc_attr(entity.id)}\" name=\"{_esc_attr(entity.name)}\">")
                 
                 # Process children (which are the actual connected nodes via edges)
-                for child in tree.children:
-                    child_lines = assemble_tree(child, indent_level + 1)
-                    result_lines.extend(child_lines)
-                
-                result_lines.append(f"{indent}</entity>")
+                stack.append((tree, indent_level, True))
+                stack.extend((child, indent_level + 1, False) for child in reversed(tree.children))
             
             elif tree.type == 'attribute' and tree.data:
-                attribute = tree.data
-                result_lines.append(f"{indent}{assemble_attribute(attribute)}")
+                _assemble_attribute(tree.data, indent, lines)
             
             elif tree.type == 'file' and tree.data:
-                file = tree.data
-                result_lines.append(f"{indent}{assemble_file(file, indent)}")
+                _assemble_file(tree.data, indent, lines)
             
             elif tree.type == 'root':
                 # For root nodes, process all children
-                for child in tree.children:
-                    child_lines = assemble_tree(child, indent_level)
-                    result_lines.extend(child_lines)
-            
-            return result_lines
-        
-        # Assemble the tree structure
-        tree_lines = assemble_tree(context)
-        lines.extend(tree_lines)
+                stack.extend((child, indent_level, False) for child in reversed(tree.children))
         
         lines.append("</context>")
         return '\n'.join(lines)
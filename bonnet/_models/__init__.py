@@ -1,4 +1,4 @@
-from typing import List, Union, Optional, Dict, Any, Callable
+from typing import List, Literal, Union, Optional, Dict, Any, Callable
 
 from pydantic import BaseModel, Field
 
@@ -44,7 +44,7 @@ class SearchResult(BaseModel):
     table_name: Optional[str] = None
     record_id: Optional[str] = None
     searchable_content: str
-    source: str  # 'node' or 'edge'
+    source: Literal['node', 'edge']
     # Edge-specific fields
     edge_id: Optional[str] = None
     from_node_id: Optional[str] = None
@@ -54,14 +54,16 @@ class SearchResult(BaseModel):
 
 class ContextTree(BaseModel):
     """Represents a node in the knowledge graph with its data and relationships."""
-    type: str  # 'entity', 'attribute', 'file', or 'root'
+    type: Literal['entity', 'attribute', 'file', 'root']
     data: Union[Entity, Attribute, File, None]  # None for root nodes
     node: Node
     children: List["ContextTree"] = Field(default_factory=list)
     edges: List[Edge] = Field(default_factory=list)
 
 
-# Registry pattern for building Pydantic models from database records
+# Registry pattern for building Pydantic models from database records.
+# Records come straight from our own schema, so builders use model_construct
+# to skip validation; any coercion the schema needs is done explicitly.
 MODEL_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Union[Entity, Attribute]]] = {}
 
 
@@ -76,7 +78,7 @@ def model_builder(record_type: str) -> Callable[[Callable], Callable]:
 @model_builder('entity')
 def build_entity_model(record_data: Dict[str, Any]) -> Entity:
     """Build an Entity model from database record data."""
-    return Entity(
+    return Entity.model_construct(
         id=record_data['id'],
         name=record_data['name'],
         short_name=record_data.get('short_name')
@@ -86,7 +88,7 @@ def build_entity_model(record_data: Dict[str, Any]) -> Entity:
 @model_builder('attribute')
 def build_attribute_model(record_data: Dict[str, Any]) -> Attribute:
     """Build an Attribute model from database record data."""
-    return Attribute(
+    return Attribute.model_construct(
         id=record_data['id'],
         type=record_data['attr_type'],
         subject=record_data['subject'],
@@ -97,20 +99,21 @@ def build_attribute_model(record_data: Dict[str, Any]) -> Attribute:
 @model_builder('file')
 def build_file_model(record_data: Dict[str, Any]) -> File:
     """Build a File model from database record data."""
-    return File(
+    return File.model_construct(
         id=record_data['id'],
         file_path=record_data['file_path'],
         description=record_data.get('description'),
         content=record_data.get('content'),
-        include_content=record_data.get('include_content', False)
+        include_content=bool(record_data.get('include_content', False))
     )
 
 
 def build_model_from_record(record_data: Dict[str, Any]) -> Union[Entity, Attribute, File]:
     """Build the appropriate Pydantic model from a database record using the registry."""
     record_type = record_data.get('type')
-    if record_type not in MODEL_BUILDERS:
+    builder = MODEL_BUILDERS.get(record_type)
+    if builder is None:
         raise ValueError(f"Unknown record type: {record_type}")
     
-    return MODEL_BUILDERS[record_type](record_data)
+    return builder(record_data)
 
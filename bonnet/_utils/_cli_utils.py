@@ -1,54 +1,87 @@
 import click
-import sys
-from functools import wraps
 from typing import Optional, Dict, List
-from .. import domain
 
-def handle_errors(func):
-    """Decorator to handle common CLI errors"""
-    @wraps(func)
-    def wrapper(*args, **kwargs):
+# Searchable content longer than this is truncated in search listings
+_CONTENT_PREVIEW_LENGTH = 100
+
+class ErrorHandlingGroup(click.Group):
+    """Click group that reports command errors through Click's own error handling"""
+    
+    def invoke(self, ctx: click.Context):
         try:
-            return func(*args, **kwargs)
-        except ValueError as e:
-            click.echo(f"Error: {e}", err=True)
-            sys.exit(1)
+            return super().invoke(ctx)
+        except (click.ClickException, click.exceptions.Exit, click.Abort):
+            raise
         except Exception as e:
-            click.echo(f"Error: {e}", err=True)
-            sys.exit(1)
-    return wrapper
+            # Click prints "Error: <message>" to stderr and exits with status 1
+            raise click.ClickException(str(e)) from e
 
 
-def find_record_with_feedback(identifier: str, no_interactive: bool = False) -> Optional[str]:
+def find_record_with_feedback(identifier: str, no_interactive: bool = False) -> Optional[Dict]:
     """
-    Find a record and return its ID, with user feedback for ambiguous results.
+    Find a record and return it, with user feedback for ambiguous results.
     
     Args:
         identifier: Either a record ID or search query
         no_interactive: If True, automatically select the first match when ambiguous
         
     Returns:
-        Record ID if found, None otherwise
+        The matching record (with id, type and display) if found, None otherwise
+    """
+    records = find_records_with_feedback([identifier], no_interactive)
+    return records[0] if records else None
+
+
+def find_records_with_feedback(identifiers: List[str], no_interactive: bool = False) -> Optional[List[Dict]]:
+    """
+    Find a record for each identifier, with user feedback for ambiguous results.
+    
+    Args:
+        identifiers: Record IDs or search queries, one per record to find
+        no_interactive: If True, automatically select the first match when ambiguous
+        
+    Returns:
+        The matching records in the order of identifiers, or None if any could not be resolved
     """
-    results = domain.search_records(identifier)
+    from .. import domain
+    
+    # Exact record IDs resolve together in one indexed lookup; the rest are
+    # searched together in one full-text query
+    exact_records = domain.get_records_by_ids(identifiers)
+    searched = [identifier for identifier in identifiers if identifier not in exact_records]
+    search_results = domain.search_records_batch(searched) if searched else {}
     
+    records = []
+    for identifier in identifiers:
+        record = exact_records.get(identifier) or _select_record_with_feedback(identifier, search_results[identifier], no_interactive)
+        if not record:
+            return None
+        records.append(record)
+    return records
+
+
+def _select_record_with_feedback(identifier: str, results: List[Dict], no_interactive: bool) -> Optional[Dict]:
+    """Pick the record for an identifier from its search results, reporting missing or ambiguous matches."""
     if not results:
         click.echo(f"No records found matching '{identifier}'", err=True)
         return None
     
     if len(results) == 1:
-        return results[0]['id']
+        return results[0]
     
     # Multiple results - handle based on options
     if no_interactive:
         click.echo(f"Multiple records found for '{identifier}'. Auto-selecting first match: {results[0]['display']} ({results[0]['type']}:{results[0]['id']})", err=True)
-        return results[0]['id']
+        return results[0]
     
-    # Show them and ask for clarification
-    click.echo(f"Multiple records found for '{identifier}'. Did you mean one of these?", err=True)
-    for i, result in enumerate(results[:5], 1):  # Show top 5 results
-        click.echo(f"  {i}. {result['display']} ({result['type']}:{result['id']})", err=True)
-    click.echo("Please be more specific, use the exact ID, or use --no-interactive to auto-select the first match.", err=True)
+    # Show them and ask for clarification, written with a single echo
+    lines = [f"Multiple records found for '{identifier}'. Did you mean one of these?"]
+    lines.extend(
+        f"  {i}. {result['display']} ({result['type']}:{result['id']})"
+        for i, result in enumerate(results[:5], 1)  # Show top 5 results
+    )
+    lines.append("Please be more specific, use the exact ID, or use --no-interactive to auto-select the first match.")
+    click.echo("\n".join(lines), err=True)
     return None
 
 
@@ -60,26 +93,30 @@ def search_and_display_records(query: str, limit: int = 10):
         query: Search query
         limit: Maximum number of results to display
     """
-    results = domain.search_records(query)
+    from .. import domain
     
-    if not results:
+    # Only the records that are shown are loaded; the rest are just counted
+    results, total = domain.search_records_page(query, limit)
+    
+    if not total:
         click.echo(f"No records found matching '{query}'")
         return
     
-    click.echo(f"Found {len(results)} record(s) matching '{query}':")
-    click.echo()
+    # Collect the whole listing and write it with a single echo
+    lines = [f"Found {total} record(s) matching '{query}':", ""]
     
     for i, result in enumerate(results[:limit], 1):
-        click.echo(f"{i}. {result['display']}")
-        click.echo(f"   Type: {result['type']}, ID: {result['id']}")
+        lines.append(f"{i}. {result['display']}")
+        lines.append(f"   Type: {result['type']}, ID: {result['id']}")
         if result.get('searchable_content'):
             # Truncate long content
             content = result['searchable_content']
-            if len(content) > 100:
-                content = content[:97] + "..."
-            click.echo(f"   Content: {content}")
-        click.echo()
+            if len(content) > _CONTENT_PREVIEW_LENGTH:
+                content = f"{content[:_CONTENT_PREVIEW_LENGTH - 3]}..."
+            lines.append(f"   Content: {content}")
+        lines.append("")
     
-    if len(results) > limit:
-        click.echo(f"... and {len(results) - limit} more results")
-
+    if total > limit:
+        lines.append(f"... and {total - limit} more results")
+    
+    click.echo("\n".join(lines))
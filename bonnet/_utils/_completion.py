@@ -1,198 +1,224 @@
 """
 Shell completion utilities for the bonnet CLI.
 """
+import atexit
+import functools
 import click
-from typing import List, Optional
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional
 
-from bonnet.database import get_all_short_names
-from .. import domain
+# The domain/database layers (and sqlite3) are imported inside each completer
+# so loading this module for the CLI does not pull them in up front
+if TYPE_CHECKING:
+    import sqlite3
 
+# Attribute types accepted by StoreAttributeInput
+_ATTRIBUTE_TYPES = ('FACT', 'REF', 'TASK', 'RULE')
+_ATTRIBUTE_TYPES_SET = frozenset(_ATTRIBUTE_TYPES)
 
+# Edge types suggested when the database has none yet
+_DEFAULT_EDGE_TYPES = ('references', 'relates_to', 'depends_on', 'contains', 'part_of')
+
+# Connection shared by completers that query SQLite directly
+_conn: Optional["sqlite3.Connection"] = None
+
+
+def _get_conn() -> "sqlite3.Connection":
+    """Open the completion connection on first use and reuse it for the rest of the process."""
+    global _conn
+    if _conn is None:
+        import sqlite3
+        from .. import database
+        
+        _conn = sqlite3.connect(database._db_path)
+        # Completion only reads; these apply to this connection alone, not to
+        # the connections the database layer opens for commands
+        _conn.execute("PRAGMA query_only = 1")
+        _conn.execute("PRAGMA temp_store = MEMORY")
+        atexit.register(_conn.close)
+    return _conn
+
+
+def _sql_cached(ttl: int) -> Callable:
+    """Decorator caching a completer's results in the database for ttl seconds.
+    
+    Shell completion runs a fresh process per TAB press, so the cache lives in
+    SQLite rather than in memory; writes to the graph clear it.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
+            from .. import database
+            
+            # Completion must never fail because of the cache, so cache errors
+            # are treated as misses and failed writes are dropped
+            key = f"{func.__name__}:{incomplete}"
+            try:
+                cached = database.completion_cache_get(key)
+            except Exception:
+                cached = None
+            if cached is not None:
+                return cached
+            
+            completions = func(ctx, param, incomplete)
+            try:
+                database.completion_cache_put(key, completions, ttl)
+            except Exception:
+                pass
+            return completions
+        return wrapper
+    return decorator
+
+
+def _filter_prefix(candidates: Iterable[str], incomplete: str) -> List[str]:
+    """Return the candidates that start with incomplete, ignoring case."""
+    prefix = incomplete.casefold()
+    return [candidate for candidate in candidates if candidate.casefold().startswith(prefix)]
+
+
+@_sql_cached(ttl=60)
 def complete_record_ids(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete record IDs for parameters that accept record identifiers.
     This works for both entity IDs and search queries.
     """
     try:
-        # If incomplete is empty, get recent records instead of searching
-        if not incomplete:
-            recent_results = domain.database.get_recent_records(5)
-            return [result['id'] for result in recent_results[:5]]
+        from .. import database, domain
         
-        # Search for records that match the incomplete string
-        results = domain.search_records(incomplete)
+        # If incomplete is empty, get recent record IDs instead of searching
+        if not incomplete:
+            return database.get_recent_record_ids(5)
         
-        # Return a list of completion items with both ID and display name
-        completions = []
-        for result in results[:10]:  # Limit to 10 results
-            # Use the ID as the completion value
-            completions.append(result['id'])
+        # IDs starting with the incomplete string come from an index range scan
+        completions = database.get_record_ids_by_prefix(incomplete, limit=10)
+        if completions:
+            return completions
         
-        return completions
+        # Otherwise treat it as a search query and offer the IDs of matching records
+        return [result['id'] for result in domain.search_records(incomplete, limit=10)]
     except Exception:
         # If there's any error, return empty list
         return []
 
 
+@_sql_cached(ttl=60)
 def complete_entity_ids(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete entity IDs specifically for entity-related parameters.
     """
     try:
-        # If incomplete is empty, get recent entities
-        if not incomplete:
-            recent_results = domain.database.search_records_by_type('entity', '', 5)
-            return [result['id'] for result in recent_results if result.get('id')]
-        
-        # Search for entities that match the incomplete string
-        results = domain.database.search_records_by_type('entity', incomplete, 10)
+        from .. import database
         
-        # Extract entity IDs from the results
-        completions = []
-        for result in results:
-            if result.get('id'):
-                completions.append(result['id'])
+        # If incomplete is empty, get recent entity IDs
+        if not incomplete:
+            return database.get_recent_record_ids(5, 'entity')
         
-        return completions
+        # Entity IDs starting with the incomplete string, from an index range scan
+        return database.get_record_ids_by_prefix(incomplete, 'entity', 10)
     except Exception:
         return []
 
 
+@_sql_cached(ttl=60)
 def complete_attribute_types(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete attribute types for the --type parameter.
     """
     try:
-        # Get distinct attribute types from the database
-        attribute_types = domain.database.get_distinct_attribute_types()
+        from .. import database
         
-        # Filter to only include valid types from the input model
-        valid_types = {'FACT', 'REF', 'TASK', 'RULE'}
-        valid_attribute_types = [attr_type for attr_type in attribute_types if attr_type in valid_types]
+        # Get distinct attribute types matching the prefix from the database
+        attribute_types = database.get_distinct_attribute_types(incomplete)
         
-        # If no valid types in database, use the default valid types
-        if not valid_attribute_types:
-            valid_attribute_types = ['FACT', 'REF', 'TASK', 'RULE']
+        # Keep only valid types from the input model, falling back to all of
+        # them when the database has none; either way listed in canonical order
+        in_use = _ATTRIBUTE_TYPES_SET.intersection(attribute_types)
+        pool = [attr_type for attr_type in _ATTRIBUTE_TYPES if attr_type in in_use] if in_use else _ATTRIBUTE_TYPES
         
-        # Filter based on incomplete string
-        return [attr_type for attr_type in valid_attribute_types if attr_type.lower().startswith(incomplete.lower())]
+        return _filter_prefix(pool, incomplete)
     except Exception:
         # Fallback to valid types if database query fails
-        fallback_types = ['FACT', 'REF', 'TASK', 'RULE']
-        return [attr_type for attr_type in fallback_types if attr_type.lower().startswith(incomplete.lower())]
+        return _filter_prefix(_ATTRIBUTE_TYPES, incomplete)
 
 
+@_sql_cached(ttl=60)
 def complete_attribute_subjects(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete attribute subjects for the --subject parameter in attr command.
     """
     try:
-        # Get distinct attribute subjects from the database
-        subjects = domain.database.get_distinct_attribute_subjects()
+        from .. import database
         
-        # Filter based on incomplete string
-        return [subject for subject in subjects if subject.lower().startswith(incomplete.lower())]
+        # Get distinct attribute subjects matching the prefix from the database
+        return database.get_distinct_attribute_subjects(incomplete)
     except Exception:
         # Return empty list if database query fails
         return []
 
 
+@_sql_cached(ttl=60)
 def complete_edge_types(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete edge types for the --type parameter in link command.
     """
     try:
-        # Get distinct edge types from the database
-        edge_types = domain.database.get_distinct_edge_types()
+        from .. import database
+        
+        # Get distinct edge types matching the prefix from the database
+        edge_types = database.get_distinct_edge_types(incomplete)
         
         # If no types in database, provide some common defaults
         if not edge_types:
-            edge_types = ['references', 'relates_to', 'depends_on', 'contains', 'part_of']
+            return _filter_prefix(_DEFAULT_EDGE_TYPES, incomplete)
         
-        # Filter based on incomplete string
-        return [edge_type for edge_type in edge_types if edge_type.lower().startswith(incomplete.lower())]
+        return edge_types
     except Exception:
         # Fallback to common types if database query fails
-        fallback_types = ['references', 'relates_to', 'depends_on', 'contains', 'part_of']
-        return [edge_type for edge_type in fallback_types if edge_type.lower().startswith(incomplete.lower())]
+        return _filter_prefix(_DEFAULT_EDGE_TYPES, incomplete)
 
 
 
+@_sql_cached(ttl=60)
 def complete_search_queries(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete search queries based on existing record content.
     """
     try:
-        # If incomplete is empty, get recent records for suggestions
-        if not incomplete:
-            recent_results = domain.database.get_recent_records(5)
-            completions = []
-            seen = set()
-            for result in recent_results:
-                if result.get('searchable_content'):
-                    content = result['searchable_content']
-                    snippet = content[:50].strip()
-                    if snippet and snippet not in seen:
-                        seen.add(snippet)
-                        completions.append(snippet)
-            return completions
-        
-        # Search for records that match the incomplete string
-        results = domain.search_records(incomplete)
-        
-        # Extract unique searchable content snippets
-        completions = []
-        seen = set()
+        from .. import database
         
-        for result in results[:10]:
-            if result.get('searchable_content'):
-                content = result['searchable_content']
-                # Take first 50 characters as completion suggestion
-                snippet = content[:50].strip()
-                if snippet and snippet not in seen:
-                    seen.add(snippet)
-                    completions.append(snippet)
-        
-        return completions
+        # Distinct content snippets from matching (or, with nothing typed, recent) records
+        return database.search_snippets(incomplete, 10 if incomplete else 5)
     except Exception:
         return []
 
 
+@_sql_cached(ttl=60)
 def complete_file_ids(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete file IDs specifically for file-related parameters.
     """
     try:
-        # If incomplete is empty, get recent files
-        if not incomplete:
-            recent_results = domain.database.search_records_by_type('file', '', 5)
-            return [result['id'] for result in recent_results if result.get('id')]
+        from .. import database
         
-        # Search for files that match the incomplete string
-        results = domain.database.search_records_by_type('file', incomplete, 10)
-        
-        # Extract file IDs from the results
-        completions = []
-        for result in results:
-            if result.get('id'):
-                completions.append(result['id'])
+        # If incomplete is empty, get recent file IDs
+        if not incomplete:
+            return database.get_recent_record_ids(5, 'file')
         
-        return completions
+        # File IDs starting with the incomplete string, from an index range scan
+        return database.get_record_ids_by_prefix(incomplete, 'file', 10)
     except Exception:
         return []
 
 
+@_sql_cached(ttl=60)
 def complete_stored_file_paths(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete file paths from stored file records in the database.
     Returns file paths that match the incomplete string.
     """
     try:
-        import sqlite3
-        
-        # Query database directly for efficiency
-        conn = sqlite3.connect(domain.database._db_path)
-        cursor = conn.cursor()
+        # Query database directly for efficiency, fetching in batches the size of the LIMIT
+        cursor = _get_conn().cursor()
+        cursor.arraysize = 20
         
         if not incomplete:
             # Get recent file paths
@@ -202,23 +228,25 @@ def complete_stored_file_paths(ctx: click.Context, param: click.Parameter, incom
                 LIMIT 10
             ''')
         else:
-            # Search for file paths matching the incomplete string
+            # Prefix-match path segments through the files FTS index
+            fts_query = '"' + incomplete.replace('"', '""') + '"*'
             cursor.execute('''
-                SELECT file_path FROM files 
-                WHERE file_path LIKE ?
-                ORDER BY created_at DESC 
+                SELECT f.file_path FROM files f
+                JOIN files_fts fts ON f.rowid = fts.rowid
+                WHERE files_fts MATCH ?
+                ORDER BY f.created_at DESC 
                 LIMIT 20
-            ''', (f'%{incomplete}%',))
+            ''', (fts_query,))
         
         completions = []
         seen = set()
         
-        for (file_path,) in cursor.fetchall():
+        # Stream rows from the cursor rather than materialising them with fetchall()
+        for (file_path,) in cursor:
             if file_path and file_path not in seen:
                 seen.add(file_path)
                 completions.append(file_path)
         
-        conn.close()
         return completions
     except Exception:
         return []
@@ -227,17 +255,20 @@ def complete_short_names(ctx: click.Context, param: click.Parameter, incomplete:
     """
     Complete short names for the --short-name parameter in topic command.
     """
-    return [short_name for short_name in get_all_short_names() if short_name.lower().startswith(incomplete.lower())]
+    from ..database import get_all_short_names
+    
+    return get_all_short_names(incomplete)
 
+@_sql_cached(ttl=60)
 def complete_about(ctx: click.Context, param: click.Parameter, incomplete: str) -> List[str]:
     """
     Complete about for the --about parameter in attr and link commands.
     """
-    # Get short names that match
-    short_names = [short_name for short_name in get_all_short_names() if short_name.lower().startswith(incomplete.lower())]
-    
-    record_ids = complete_record_ids(ctx, param, incomplete)
-    
-    # Combine and return unique values
-    return list(set(short_names + record_ids))
-    
\ No newline at end of file
+    try:
+        from .. import database
+        
+        # Short names and record IDs come back from a single query; with nothing
+        # typed yet only the few most recent records are offered
+        return database.get_about_completions(incomplete, 10 if incomplete else 5)
+    except Exception:
+        return []
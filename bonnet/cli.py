@@ -1,16 +1,13 @@
+import functools
 import click
+from typing import TYPE_CHECKING
 
-from ._assemblers import xml_assembler
-from ._models import ContextTree
-from ._input_models import (
-    SearchEntitiesInput,
-    StoreEntityInput,
-    StoreAttributeInput,
-    StoreFileInput,
-    LinkInput,
+from ._utils._cli_utils import (
+    ErrorHandlingGroup,
+    find_record_with_feedback,
+    find_records_with_feedback,
+    search_and_display_records,
 )
-from . import domain
-from ._utils._cli_utils import handle_errors, find_record_with_feedback, search_and_display_records
 from ._utils._completion import (
     complete_attribute_types,
     complete_attribute_subjects,
@@ -19,14 +16,27 @@ from ._utils._completion import (
     complete_about,
 )
 
+# The domain layer, models and assembler are imported inside the commands that
+# use them so `bonnet --help` and shell completion do not load Pydantic.
+# Input models whose fields Click has already typed are built with
+# model_construct; StoreAttributeInput is still validated since it checks --type.
+if TYPE_CHECKING:
+    from ._assemblers import Assembler
+    from ._models import ContextTree
 
-assembler = xml_assembler()
 
-def display_context(context: ContextTree):
+@functools.lru_cache(maxsize=1)
+def _get_assembler() -> "Assembler":
+    """Create the XML assembler on first use."""
+    from ._assemblers import xml_assembler
+    
+    return xml_assembler()
+
+def display_context(context: "ContextTree"):
     """Display XML context for an entity"""
-    click.echo(assembler(context))
+    click.echo(_get_assembler()(context))
 
-@click.group()
+@click.group(cls=ErrorHandlingGroup)
 @click.version_option(version='1.0.0')
 def cli():
     """Bonnet - Knowledge Base Management CLI
@@ -44,10 +54,12 @@ def cli():
 @click.option('--id', '-i', help='Unique Entity ID (auto-generated if not provided)')
 @click.option('--short-name', '-x', help='Short name for the entity')
 @click.argument('text')
-@handle_errors
 def topic(id, short_name, text):
     """Store a master ENTITY record"""
-    input_model = StoreEntityInput(e_id=id, name=text, short_name=short_name)
+    from . import domain
+    from ._input_models import StoreEntityInput
+    
+    input_model = StoreEntityInput.model_construct(e_id=id, name=text, short_name=short_name)
     actual_id = domain.store_entity(input_model)
     short_name_msg = f" (short name: {short_name})" if short_name else ""
     click.echo(f"Stored topic '{text}'{short_name_msg} with ID {actual_id}")
@@ -58,7 +70,6 @@ def topic(id, short_name, text):
 @click.option('--subject', required=True, help='Subject text', shell_complete=complete_attribute_subjects)
 @click.option('--no-interactive', is_flag=True, help='Automatically select first match when multiple records found')
 @click.argument('detail', shell_complete=complete_search_queries)
-@handle_errors
 def attr(about, attr_type, subject, detail, no_interactive):
     """Store an attribute
     
@@ -71,16 +82,12 @@ def attr(about, attr_type, subject, detail, no_interactive):
         attr --about "bike" --type FACT --subject type "mountain"  # Link to any record
         attr --about "shark" --type FACT --subject species "great white" --no-interactive  # Auto-select first match
     """
-    # Find the target record using the enhanced function
-    target_record_id = find_record_with_feedback(about, no_interactive)
-    if not target_record_id:
-        return
+    from . import domain
+    from ._input_models import StoreAttributeInput
     
-    # Get the full record details
-    results = domain.search_records(about)
-    target_record = next((r for r in results if r['id'] == target_record_id), None)
+    # Find the target record using the enhanced function
+    target_record = find_record_with_feedback(about, no_interactive)
     if not target_record:
-        click.echo(f"Error: Could not find record with ID {target_record_id}", err=True)
         return
     
     input_model = StoreAttributeInput(attr_id=target_record['id'], attr_type=attr_type, subject=subject, detail=detail)
@@ -93,7 +100,6 @@ def attr(about, attr_type, subject, detail, no_interactive):
 @click.option('--content', help='File content to include in context')
 @click.option('--include-content', is_flag=True, help='Include file content in XML output')
 @click.argument('file_path')
-@handle_errors
 def file(id, description, content, include_content, file_path):
     """Store a file reference
     
@@ -103,7 +109,10 @@ def file(id, description, content, include_content, file_path):
         file --description "Readme" --content "This is the readme content" --include-content readme.txt
         file --description "Instructions" --content "Read this when setting up" --include-content instructions.txt
     """
-    input_model = StoreFileInput(
+    from . import domain
+    from ._input_models import StoreFileInput
+    
+    input_model = StoreFileInput.model_construct(
         file_id=id, 
         file_path=file_path, 
         description=description,
@@ -120,7 +129,6 @@ def file(id, description, content, include_content, file_path):
 @click.option('--no-interactive', is_flag=True, help='Automatically select first match when multiple records found')
 @click.argument('from_identifier', shell_complete=complete_about)
 @click.argument('to_identifier', shell_complete=complete_about)
-@handle_errors
 def link(from_identifier, to_identifier, edge_type, content, no_interactive):
     """Create a link between any two records
     
@@ -133,31 +141,16 @@ def link(from_identifier, to_identifier, edge_type, content, no_interactive):
         link "bike" "red color"              # Link bike to red color attribute
         link "shark" "fish" --no-interactive  # Auto-select first matches
     """
-    # Find source record using the enhanced function
-    from_record_id = find_record_with_feedback(from_identifier, no_interactive)
-    if not from_record_id:
-        return
-    
-    # Get the full source record details
-    from_results = domain.search_records(from_identifier)
-    from_record = next((r for r in from_results if r['id'] == from_record_id), None)
-    if not from_record:
-        click.echo(f"Error: Could not find source record with ID {from_record_id}", err=True)
-        return
+    from . import domain
+    from ._input_models import LinkInput
     
-    # Find target record using the enhanced function
-    to_record_id = find_record_with_feedback(to_identifier, no_interactive)
-    if not to_record_id:
+    # Find source and target records together using the enhanced function
+    records = find_records_with_feedback([from_identifier, to_identifier], no_interactive)
+    if not records:
         return
+    from_record, to_record = records
     
-    # Get the full target record details
-    to_results = domain.search_records(to_identifier)
-    to_record = next((r for r in to_results if r['id'] == to_record_id), None)
-    if not to_record:
-        click.echo(f"Error: Could not find target record with ID {to_record_id}", err=True)
-        return
-    
-    input_model = LinkInput(
+    input_model = LinkInput.model_construct(
         from_type=from_record['type'],
         from_id=from_record['id'],
         to_type=to_record['type'],
@@ -170,7 +163,6 @@ def link(from_identifier, to_identifier, edge_type, content, no_interactive):
 
 @cli.command()
 @click.option('--about', required=True, help='Entity ID or search query', shell_complete=complete_about)
-@handle_errors
 def context(about):
     """Search and generate context for entities
     
@@ -182,7 +174,10 @@ def context(about):
         context --about "car"                 # Using search query
         context --about "red color"           # Using search query
     """
-    input_model = SearchEntitiesInput(query=about)
+    from . import domain
+    from ._input_models import SearchEntitiesInput
+    
+    input_model = SearchEntitiesInput.model_construct(query=about)
     context_tree = domain.search_entities(input_model)
     
     # Check if we have any results
@@ -196,7 +191,6 @@ def context(about):
 @cli.command()
 @click.option('--limit', default=10, help='Maximum number of results to show (default: 10)')
 @click.argument('query', shell_complete=complete_about)
-@handle_errors
 def search(limit, query):
     """Search for records by content across all record types
     
@@ -289,10 +283,16 @@ eval (env _BONNET_COMPLETE=fish_source {bonnet_path})
     # Output the script
     if output:
         try:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(output), exist_ok=True)
-            with open(output, 'w') as f:
-                f.write(script)
+            # Create directory if it doesn't exist (a bare filename has none)
+            output_dir = os.path.dirname(output)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            # Write the encoded script straight to the file descriptor
+            fd = os.open(output, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.write(fd, script.encode('utf-8'))
+            finally:
+                os.close(fd)
             click.echo(f"Completion script written to {output}")
         except Exception as e:
             click.echo(f"Error writing to {output}: {e}", err=True)
@@ -1,6 +1,8 @@
+import atexit
 import sqlite3
 import os
 import uuid
+import json
 from contextlib import contextmanager
 from typing import List, Dict, Optional, Tuple, Callable
 
@@ -10,16 +12,43 @@ os.makedirs(_config_dir, exist_ok=True)
 _db_path = os.path.join(_config_dir, "bonnet.db")
 _initialized = False
 
+# Connection shared by all database operations, opened on first use
+_conn: Optional[sqlite3.Connection] = None
+
 # Registry for searchable content builders
 SEARCHABLE_BUILDERS: Dict[str, Callable[[Dict], str]] = {}
 
+# Map record types to the tables that store them
+RECORD_TYPE_TABLES: Dict[str, str] = {
+    'entity': 'entities',
+    'attribute': 'attributes',
+    'file': 'files'
+}
+_VALID_TABLES = frozenset(RECORD_TYPE_TABLES.values())
+
+def _like_prefix(prefix: str) -> str:
+    """Build a LIKE pattern matching values that start with prefix (escape char is backslash)."""
+    escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"{escaped}%"
+
+def get_connection() -> sqlite3.Connection:
+    """Get the database connection shared by every operation in this process."""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(_db_path)
+        # Per-connection tuning: larger page cache, in-memory temp tables and
+        # memory-mapped reads of the database file
+        _conn.execute("PRAGMA cache_size = -65536")
+        _conn.execute("PRAGMA temp_store = MEMORY")
+        _conn.execute("PRAGMA mmap_size = 268435456")
+        atexit.register(_conn.close)
+    return _conn
+
 @contextmanager
 def transaction(conn: sqlite3.Connection = None, rollback: bool = True):
     """Context manager for database transactions"""
-    should_close = False
     if conn is None:
-        conn = sqlite3.connect(_db_path)
-        should_close = True
+        conn = get_connection()
     try:
         yield conn.cursor()
         conn.commit()
@@ -27,9 +56,6 @@ def transaction(conn: sqlite3.Connection = None, rollback: bool = True):
         if rollback:
             conn.rollback()
         raise
-    finally:
-        if should_close:
-            conn.close()
 
 def searchable_builder(table_name: str):
     """Decorator to register searchable content builders for tables."""
@@ -44,151 +70,204 @@ def init_database():
     if _initialized:
         return
         
-    conn = sqlite3.connect(_db_path)
-    try:
-        with transaction(conn, rollback=False) as cursor:
-            # Create entities table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS entities (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    short_name TEXT,
-                    node_id TEXT NOT NULL,
-                    FOREIGN KEY (node_id) REFERENCES nodes(id)
-                )
-            ''')
-            
-            # Create attributes table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS attributes (
-                    id TEXT PRIMARY KEY,
-                    type TEXT NOT NULL,
-                    subject TEXT,
-                    detail TEXT,
-                    node_id TEXT NOT NULL,
-                    FOREIGN KEY (node_id) REFERENCES nodes(id)
-                )
-            ''')
-            
-            # Create files table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS files (
-                    id TEXT PRIMARY KEY,
-                    file_path TEXT NOT NULL,
-                    description TEXT,
-                    content TEXT,
-                    include_content BOOLEAN DEFAULT 0,
-                    node_id TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (node_id) REFERENCES nodes(id)
-                )
-            ''')
-            
-            # Create nodes table for knowledge graph
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS nodes (
-                    id TEXT PRIMARY KEY,
-                    table_name TEXT NOT NULL,
-                    record_id TEXT NOT NULL,
-                    searchable_content TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create edges table for relationships
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS edges (
-                    id TEXT PRIMARY KEY,
-                    from_node_id TEXT NOT NULL,
-                    to_node_id TEXT NOT NULL,
-                    edge_type TEXT,
-                    searchable_content TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (from_node_id) REFERENCES nodes(id),
-                    FOREIGN KEY (to_node_id) REFERENCES nodes(id)
-                )
-            ''')
-            
-            # Create id_counters table to track ID numbers for each prefix
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS id_counters (
-                    prefix TEXT PRIMARY KEY,
-                    next_number INTEGER NOT NULL DEFAULT 1
-                )
-            ''')
-            
-            # Create indexes
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(name)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_entities_node_id ON entities(node_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_attributes_type ON attributes(type)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_attributes_node_id ON attributes(node_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_path ON files(file_path)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_node_id ON files(node_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_nodes_table_record ON nodes(table_name, record_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_edges_from_node ON edges(from_node_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_edges_to_node ON edges(to_node_id)')
-            
-            # Create FTS5 virtual tables with porter tokenizer for stemming
-            cursor.execute('''
-                CREATE VIRTUAL TABLE IF NOT EXISTS nodes_fts USING fts5(
-                    record_id,
-                    searchable_content,
-                    content='nodes',
-                    content_rowid='rowid'
-                )
-            ''')
-            
-            cursor.execute('''
-                CREATE VIRTUAL TABLE IF NOT EXISTS edges_fts USING fts5(
-                    searchable_content,
-                    content='edges',
-                    content_rowid='rowid',
-                    tokenize='porter unicode61'
-                )
-            ''')
-            
-            # Create triggers to keep FTS tables in sync
-            # Nodes FTS triggers
-            cursor.execute('''
-                CREATE TRIGGER IF NOT EXISTS nodes_ai AFTER INSERT ON nodes BEGIN
-                    INSERT INTO nodes_fts(rowid, record_id, searchable_content) VALUES (new.rowid, new.record_id, new.searchable_content);
-                END
-            ''')
-            
-            cursor.execute('''
-                CREATE TRIGGER IF NOT EXISTS nodes_ad AFTER DELETE ON nodes BEGIN
-                    INSERT INTO nodes_fts(nodes_fts, rowid, record_id, searchable_content) VALUES('delete', old.rowid, old.record_id, old.searchable_content);
-                END
-            ''')
-            
-            cursor.execute('''
-                CREATE TRIGGER IF NOT EXISTS nodes_au AFTER UPDATE ON nodes BEGIN
-                    INSERT INTO nodes_fts(nodes_fts, rowid, record_id, searchable_content) VALUES('delete', old.rowid, old.record_id, old.searchable_content);
-                    INSERT INTO nodes_fts(rowid, record_id, searchable_content) VALUES (new.rowid, new.record_id, new.searchable_content);
-                END
-            ''')
-            
-            # Edges FTS triggers
-            cursor.execute('''
-                CREATE TRIGGER IF NOT EXISTS edges_ai AFTER INSERT ON edges BEGIN
-                    INSERT INTO edges_fts(rowid, searchable_content) VALUES (new.rowid, new.searchable_content);
-                END
-            ''')
-            
-            cursor.execute('''
-                CREATE TRIGGER IF NOT EXISTS edges_ad AFTER DELETE ON edges BEGIN
-                    INSERT INTO edges_fts(edges_fts, rowid, searchable_content) VALUES('delete', old.rowid, old.searchable_content);
-                END
-            ''')
-            
-            cursor.execute('''
-                CREATE TRIGGER IF NOT EXISTS edges_au AFTER UPDATE ON edges BEGIN
-                    INSERT INTO edges_fts(edges_fts, rowid, searchable_content) VALUES('delete', old.rowid, old.searchable_content);
-                    INSERT INTO edges_fts(rowid, searchable_content) VALUES (new.rowid, new.searchable_content);
-                END
-            ''')
-    finally:
-        conn.close()
+    conn = get_connection()
+    with transaction(conn, rollback=False) as cursor:
+        # Create entities table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS entities (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                short_name TEXT,
+                node_id TEXT NOT NULL,
+                FOREIGN KEY (node_id) REFERENCES nodes(id)
+            )
+        ''')
+        
+        # Create attributes table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS attributes (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                subject TEXT,
+                detail TEXT,
+                node_id TEXT NOT NULL,
+                FOREIGN KEY (node_id) REFERENCES nodes(id)
+            )
+        ''')
+        
+        # Create files table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS files (
+                id TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL,
+                description TEXT,
+                content TEXT,
+                include_content BOOLEAN DEFAULT 0,
+                node_id TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (node_id) REFERENCES nodes(id)
+            )
+        ''')
+        
+        # Create nodes table for knowledge graph
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS nodes (
+                id TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                searchable_content TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create edges table for relationships
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS edges (
+                id TEXT PRIMARY KEY,
+                from_node_id TEXT NOT NULL,
+                to_node_id TEXT NOT NULL,
+                edge_type TEXT,
+                searchable_content TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (from_node_id) REFERENCES nodes(id),
+                FOREIGN KEY (to_node_id) REFERENCES nodes(id)
+            )
+        ''')
+        
+        # Create id_counters table to track ID numbers for each prefix
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS id_counters (
+                prefix TEXT PRIMARY KEY,
+                next_number INTEGER NOT NULL DEFAULT 1
+            )
+        ''')
+        
+        # Create completion_cache table so shell completions survive across processes
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS completion_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at INTEGER NOT NULL
+            )
+        ''')
+        
+        # Create indexes
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_entities_node_id ON entities(node_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_entities_short_name ON entities(short_name COLLATE NOCASE)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attributes_type ON attributes(type COLLATE NOCASE)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attributes_node_id ON attributes(node_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_attributes_subject ON attributes(subject COLLATE NOCASE)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_path ON files(file_path)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_node_id ON files(node_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_nodes_table_record ON nodes(table_name, record_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_nodes_record_id ON nodes(record_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_nodes_record_id_nocase ON nodes(record_id COLLATE NOCASE)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_edges_from_node ON edges(from_node_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_edges_to_node ON edges(to_node_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_edges_type ON edges(edge_type COLLATE NOCASE)')
+        
+        # Create FTS5 virtual tables with porter tokenizer for stemming
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS nodes_fts USING fts5(
+                record_id,
+                searchable_content,
+                content='nodes',
+                content_rowid='rowid'
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS edges_fts USING fts5(
+                searchable_content,
+                content='edges',
+                content_rowid='rowid',
+                tokenize='porter unicode61'
+            )
+        ''')
+        
+        # Path segments stay whole tokens (foo.py, my-file) for prefix completion
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+                file_path,
+                content='files',
+                content_rowid='rowid',
+                tokenize="unicode61 tokenchars '.-_'"
+            )
+        ''')
+        
+        # Create triggers to keep FTS tables in sync
+        # Nodes FTS triggers
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS nodes_ai AFTER INSERT ON nodes BEGIN
+                INSERT INTO nodes_fts(rowid, record_id, searchable_content) VALUES (new.rowid, new.record_id, new.searchable_content);
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS nodes_ad AFTER DELETE ON nodes BEGIN
+                INSERT INTO nodes_fts(nodes_fts, rowid, record_id, searchable_content) VALUES('delete', old.rowid, old.record_id, old.searchable_content);
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS nodes_au AFTER UPDATE ON nodes BEGIN
+                INSERT INTO nodes_fts(nodes_fts, rowid, record_id, searchable_content) VALUES('delete', old.rowid, old.record_id, old.searchable_content);
+                INSERT INTO nodes_fts(rowid, record_id, searchable_content) VALUES (new.rowid, new.record_id, new.searchable_content);
+            END
+        ''')
+        
+        # Edges FTS triggers
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS edges_ai AFTER INSERT ON edges BEGIN
+                INSERT INTO edges_fts(rowid, searchable_content) VALUES (new.rowid, new.searchable_content);
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS edges_ad AFTER DELETE ON edges BEGIN
+                INSERT INTO edges_fts(edges_fts, rowid, searchable_content) VALUES('delete', old.rowid, old.searchable_content);
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS edges_au AFTER UPDATE ON edges BEGIN
+                INSERT INTO edges_fts(edges_fts, rowid, searchable_content) VALUES('delete', old.rowid, old.searchable_content);
+                INSERT INTO edges_fts(rowid, searchable_content) VALUES (new.rowid, new.searchable_content);
+            END
+        ''')
+        
+        # Files FTS triggers
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+                INSERT INTO files_fts(rowid, file_path) VALUES (new.rowid, new.file_path);
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+                INSERT INTO files_fts(files_fts, rowid, file_path) VALUES('delete', old.rowid, old.file_path);
+            END
+        ''')
+        
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE ON files BEGIN
+                INSERT INTO files_fts(files_fts, rowid, file_path) VALUES('delete', old.rowid, old.file_path);
+                INSERT INTO files_fts(rowid, file_path) VALUES (new.rowid, new.file_path);
+            END
+        ''')
+        
+        # Any change to the graph invalidates cached completions
+        for table in ('nodes', 'edges'):
+            for event, suffix in (('INSERT', 'ai'), ('DELETE', 'ad'), ('UPDATE', 'au')):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS completion_cache_{table}_{suffix} AFTER {event} ON {table} BEGIN
+                        DELETE FROM completion_cache;
+                    END
+                ''')
+        
+        # Sweep expired completions once per process
+        cursor.execute("DELETE FROM completion_cache WHERE expires_at < CAST(strftime('%s', 'now') AS INTEGER)")
     
     _initialized = True
 
@@ -330,7 +409,7 @@ def store_attribute(attr_id: str, attr_type: str, subject: str, detail: str) ->
 def search_nodes(query: str) -> List[Dict]:
     """Search for nodes using FTS across both nodes and edges."""
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
     results = []
@@ -373,13 +452,12 @@ def search_nodes(query: str) -> List[Dict]:
             'source': 'edge'
         })
     
-    conn.close()
     return results
 
 def get_related_nodes(node_id: str, max_depth: int = 1) -> List[Dict]:
     """Get nodes related to the given node through graph traversal."""
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
     related_nodes = set()
@@ -416,7 +494,6 @@ def get_related_nodes(node_id: str, max_depth: int = 1) -> List[Dict]:
     
     # Get details for related nodes
     if not related_nodes:
-        conn.close()
         return []
     
     placeholders = ','.join(['?' for _ in related_nodes])
@@ -435,7 +512,6 @@ def get_related_nodes(node_id: str, max_depth: int = 1) -> List[Dict]:
             'searchable_content': row[3]
         })
     
-    conn.close()
     return results
 
 def create_edge(from_node_id: str, to_node_id: str, edge_type: str, searchable_content: str = "") -> str:
@@ -455,7 +531,7 @@ def create_edge(from_node_id: str, to_node_id: str, edge_type: str, searchable_c
 def get_record_by_node(node_id: str) -> Dict:
     """Get the actual record for a given node."""
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Get node info
@@ -465,7 +541,6 @@ def get_record_by_node(node_id: str) -> Dict:
     
     node_row = cursor.fetchone()
     if not node_row:
-        conn.close()
         return None
     
     table_name, record_id = node_row
@@ -522,13 +597,12 @@ def get_record_by_node(node_id: str) -> Dict:
                 'node_id': row[5]
             }
     
-    conn.close()
     return None
 
 def get_entity_context(e_id: str) -> Dict:
     """Get all linked records for an entity ID."""
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Get entity info
@@ -559,8 +633,6 @@ def get_entity_context(e_id: str) -> Dict:
         }
         attributes.append(attr)
     
-    conn.close()
-    
     return {
         'e_id': e_id,
         'entity_name': entity_name,
@@ -612,10 +684,21 @@ def get_graph_structure(query: str, include_related: bool = True, max_depth: int
     # First, search for matching nodes and edges
     search_results = search_nodes(query)
     
-    if not search_results:
-        return []
+    # Start from each matching node, and from both ends of each matching edge
+    root_node_ids = []
+    for result in search_results:
+        if result['source'] == 'node':
+            root_node_ids.append(result['node_id'])
+        elif result['source'] == 'edge':
+            root_node_ids.append(result['from_node_id'])
+            root_node_ids.append(result['to_node_id'])
     
-    # Build graph structure starting from search results
+    return get_graph_structure_for_nodes(root_node_ids, include_related, max_depth)
+
+
+def get_graph_structure_for_nodes(node_ids: List[str], include_related: bool = True, max_depth: int = 1) -> List[Dict]:
+    """Get the knowledge graph structure starting from the given nodes."""
+    # Build graph structure starting from the given nodes
     graph_nodes = []
     processed_nodes = set()
     
@@ -656,28 +739,15 @@ def get_graph_structure(query: str, include_related: bool = True, max_depth: int
         
         return node_structure
     
-    # Build tree for each search result
-    for result in search_results:
-        if result['source'] == 'node':
-            node_tree = build_node_tree(result['node_id'])
-            if node_tree:
-                graph_nodes.append(node_tree)
-        elif result['source'] == 'edge':
-            # For edges, start from both ends
-            from_tree = build_node_tree(result['from_node_id'])
-            to_tree = build_node_tree(result['to_node_id'])
-            if from_tree:
-                graph_nodes.append(from_tree)
-            if to_tree and to_tree != from_tree:
-                graph_nodes.append(to_tree)
+    # Build tree for each starting node; nodes already reached are skipped
+    for node_id in node_ids:
+        node_tree = build_node_tree(node_id)
+        if node_tree:
+            graph_nodes.append(node_tree)
     
     return graph_nodes
 
 
-def get_connection():
-    """Get a database connection."""
-    return sqlite3.connect(_db_path)
-
 def get_node_by_id(node_id: str) -> Optional[Dict]:
     """Get a node by its ID."""
     with get_connection() as conn:
@@ -726,11 +796,7 @@ def get_edges_to_node(node_id: str) -> List[Dict]:
 
 def get_entity_node_id(entity_id: str) -> str:
     """Get the node ID for an entity."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT node_id FROM entities WHERE id = ?", (entity_id,))
-        row = cursor.fetchone()
-        return row[0] if row else None
+    return get_node_id_by_record_id('entities', entity_id)
 
 def store_file(file_id: str, file_path: str, description: str = None, content: str = None, include_content: bool = False) -> bool:
     """Store a file record."""
@@ -761,6 +827,7 @@ def store_file(file_id: str, file_path: str, description: str = None, content: s
 
 def get_node_id_by_record_id(table_name: str, record_id: str) -> str:
     """Get the node ID for any record by table name and record ID."""
+    init_database()
     with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute(f"SELECT node_id FROM {table_name} WHERE id = ?", (record_id,))
@@ -793,11 +860,7 @@ def link_nodes(from_table: str, from_record_id: str, to_table: str, to_record_id
 
 def get_file_node_id(file_id: str) -> str:
     """Get the node ID for a file."""
-    with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT node_id FROM files WHERE id = ?", (file_id,))
-        row = cursor.fetchone()
-        return row[0] if row else None
+    return get_node_id_by_record_id('files', file_id)
 
 
 def get_file_by_id(file_id: str) -> Optional[Dict]:
@@ -831,27 +894,8 @@ def get_file_by_id(file_id: str) -> Optional[Dict]:
 
 
 
-def search_records(query: str) -> List[Dict]:
-    """
-    Search for records by content or ID. Returns all matches.
-    
-    Args:
-        query: Search query string or record ID
-        
-    Returns:
-        List of matching records
-    """
-    init_database()
-    conn = sqlite3.connect(_db_path)
-    cursor = conn.cursor()
-    
-    results = []
-    
-    # Handle empty query - return recent records instead
-    if not query or not query.strip():
-        conn.close()
-        return get_recent_records(10)
-    
+def _search_node_rows(cursor, query: str, limit: Optional[int] = None) -> List[Tuple]:
+    """Helper function to find (node id, table name, record id, searchable content) rows matching a non-empty query."""
     # Escape FTS5 special characters to prevent syntax errors
     # FTS5 special characters: " * : ( ) [ ] { } ^ $ . + ? | \ /
     fts_query = query.replace('"', '""')  # Escape quotes
@@ -863,91 +907,406 @@ def search_records(query: str) -> List[Dict]:
             FROM nodes n
             JOIN nodes_fts fts ON n.rowid = fts.rowid
             WHERE nodes_fts MATCH ?
-        ''', (fts_query,))
-        
-        for row in cursor.fetchall():
-            node_id, table_name, record_id, searchable_content = row
-            results.extend(_get_record_data(cursor, table_name, record_id, searchable_content))
+            LIMIT ?
+        ''', (fts_query, -1 if limit is None else limit))
     except sqlite3.OperationalError:
         # If FTS5 query fails, fall back to LIKE search
         cursor.execute('''
             SELECT id, table_name, record_id, searchable_content
             FROM nodes
             WHERE searchable_content LIKE ? OR record_id LIKE ?
-            LIMIT 20
-        ''', (f'%{query}%', f'%{query}%'))
+            LIMIT ?
+        ''', (f'%{query}%', f'%{query}%', 20 if limit is None else min(limit, 20)))
+    
+    return cursor.fetchall()
+
+
+def search_records(query: str, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Search for records by content or ID. Returns all matches unless limited.
+    
+    Args:
+        query: Search query string or record ID
+        limit: Maximum number of records to return (all matches if None)
         
-        for row in cursor.fetchall():
-            node_id, table_name, record_id, searchable_content = row
-            results.extend(_get_record_data(cursor, table_name, record_id, searchable_content))
+    Returns:
+        List of matching records
+    """
+    init_database()
+    
+    # Handle empty query - return recent records instead
+    if not query or not query.strip():
+        return get_recent_records(10 if limit is None else limit)
+    
+    cursor = get_connection().cursor()
+    
+    results = []
+    for node_id, table_name, record_id, searchable_content in _search_node_rows(cursor, query, limit):
+        results.extend(_get_record_data(cursor, table_name, record_id, searchable_content))
     
-    conn.close()
     return results
 
 
-def get_distinct_attribute_types() -> List[str]:
+def search_records_page(query: str, limit: int) -> Tuple[List[Dict], int]:
+    """
+    Search for records by content or ID, loading full details for the first page only.
+    
+    Args:
+        query: Search query string or record ID
+        limit: Maximum number of records to load
+        
+    Returns:
+        Tuple of (the first `limit` matching records, total number of matches)
+    """
+    init_database()
+    
+    # Handle empty query - return recent records instead, as search_records does
+    if not query or not query.strip():
+        results = get_recent_records(10)
+        return results[:limit], len(results)
+    
+    cursor = get_connection().cursor()
+    
+    # Matching rows are cheap to count; only the shown ones need their record looked up
+    rows = _search_node_rows(cursor, query)
+    results = []
+    for node_id, table_name, record_id, searchable_content in rows:
+        if len(results) >= limit:
+            break
+        results.extend(_get_record_data(cursor, table_name, record_id, searchable_content))
+    
+    return results, len(rows)
+
+
+def search_records_batch(queries: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Search for records matching each of several queries in one FTS statement.
+    
+    Args:
+        queries: Search query strings
+        
+    Returns:
+        Mapping of each query to its matching records, as search_records would return them
+    """
+    init_database()
+    results: Dict[str, List[Dict]] = {query: [] for query in queries}
+    
+    # Blank queries list recent records rather than searching
+    fts_queries = []
+    for query in results:
+        if not query or not query.strip():
+            results[query] = search_records(query)
+        else:
+            fts_queries.append(query)
+    
+    if not fts_queries:
+        return results
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # One MATCH per query, tagged by position so rows can be split back out
+    match_sql = '''
+        SELECT ? AS query_index, n.rowid AS node_rowid, n.table_name, n.record_id, n.searchable_content
+        FROM nodes n
+        JOIN nodes_fts fts ON n.rowid = fts.rowid
+        WHERE nodes_fts MATCH ?
+    '''
+    params = []
+    for index, query in enumerate(fts_queries):
+        params.extend((index, query.replace('"', '""')))
+    
+    try:
+        cursor.execute(
+            ' UNION ALL '.join([match_sql] * len(fts_queries)) + ' ORDER BY query_index, node_rowid',
+            params
+        )
+    except sqlite3.OperationalError:
+        # If any FTS5 query fails, let search_records apply its LIKE fallback per query
+        for query in fts_queries:
+            results[query] = search_records(query)
+        return results
+    
+    for index, _, table_name, record_id, searchable_content in cursor.fetchall():
+        results[fts_queries[index]].extend(_get_record_data(cursor, table_name, record_id, searchable_content))
+    return results
+
+
+def get_records_by_ids(record_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Look up several records by their exact IDs in one query, without going through full-text search.
+    
+    Args:
+        record_ids: The record IDs
+        
+    Returns:
+        Mapping of each ID held by exactly one record to that record, in the same
+        shape as search_records results; other IDs are left out
+    """
+    init_database()
+    if not record_ids:
+        return {}
+    
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    placeholders = ', '.join('?' * len(record_ids))
+    cursor.execute(f'''
+        SELECT table_name, record_id, searchable_content
+        FROM nodes
+        WHERE record_id IN ({placeholders})
+    ''', tuple(record_ids))
+    
+    rows_by_id: Dict[str, List[Tuple]] = {}
+    for row in cursor.fetchall():
+        rows_by_id.setdefault(row[1], []).append(row)
+    
+    records = {}
+    for record_id, rows in rows_by_id.items():
+        # An ID shared by records in different tables is left to search to disambiguate
+        if len(rows) != 1:
+            continue
+        results = _get_record_data(cursor, *rows[0])
+        if results:
+            records[record_id] = results[0]
+    return records
+
+
+def get_record_by_id(record_id: str) -> Optional[Dict]:
+    """
+    Look up a record by its exact ID without going through full-text search.
+    
+    Args:
+        record_id: The record ID
+        
+    Returns:
+        The record in the same shape as search_records results, or None if no
+        record (or more than one record) has this ID
+    """
+    return get_records_by_ids([record_id]).get(record_id)
+
+
+def search_snippets(query: str, limit: int = 10, length: int = 50) -> List[str]:
+    """
+    Get distinct leading snippets of searchable content for matching records.
+    
+    Args:
+        query: Search query string (the most recent records are used when empty)
+        limit: Maximum number of snippets to return
+        length: Number of leading characters of searchable content to keep
+        
+    Returns:
+        Unique, whitespace-trimmed snippets with the best matches first
+    """
+    init_database()
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    # Snippets are cut, trimmed and deduplicated in SQL so each one crosses
+    # into Python once, however many records share it
+    snippet_sql = "trim(substr(n.searchable_content, 1, ?), ' ' || char(9, 10, 13))"
+    
+    if not query or not query.strip():
+        cursor.execute(f'''
+            SELECT {snippet_sql} AS snippet
+            FROM nodes n
+            GROUP BY snippet
+            HAVING snippet != ''
+            ORDER BY max(n.created_at) DESC
+            LIMIT ?
+        ''', (length, limit))
+    else:
+        try:
+            cursor.execute(f'''
+                SELECT {snippet_sql} AS snippet
+                FROM nodes n
+                JOIN nodes_fts fts ON n.rowid = fts.rowid
+                WHERE nodes_fts MATCH ?
+                GROUP BY snippet
+                HAVING snippet != ''
+                ORDER BY min(fts.rank)
+                LIMIT ?
+            ''', (length, query.replace('"', '""'), limit))
+        except sqlite3.OperationalError:
+            # If FTS5 query fails, fall back to LIKE search as search_records does
+            cursor.execute(f'''
+                SELECT {snippet_sql} AS snippet
+                FROM nodes n
+                WHERE n.searchable_content LIKE ? OR n.record_id LIKE ?
+                GROUP BY snippet
+                HAVING snippet != ''
+                ORDER BY min(n.rowid)
+                LIMIT ?
+            ''', (length, f'%{query}%', f'%{query}%', limit))
+    
+    return [row[0] for row in cursor.fetchall()]
+
+
+def get_about_completions(prefix: str = "", limit: int = 10) -> List[str]:
+    """
+    Get short names and record IDs to suggest for a record identifier in one query.
+    
+    Args:
+        prefix: Text typed so far; short names must start with it and records
+            must match it (the most recent records are used when it is empty)
+        limit: Maximum number of record IDs to include
+        
+    Returns:
+        Matching short names followed by matching record IDs, without duplicates
+    """
+    init_database()
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    short_names_sql = '''
+        SELECT short_name FROM entities
+        WHERE short_name != '' AND short_name LIKE ? ESCAPE '\\'
+    '''
+    
+    if not prefix.strip():
+        cursor.execute(f'''
+            {short_names_sql}
+            UNION ALL
+            SELECT * FROM (
+                SELECT record_id FROM nodes
+                ORDER BY created_at DESC
+                LIMIT ?
+            )
+        ''', (_like_prefix(prefix), limit))
+    else:
+        try:
+            cursor.execute(f'''
+                {short_names_sql}
+                UNION ALL
+                SELECT * FROM (
+                    SELECT n.record_id FROM nodes n
+                    JOIN nodes_fts fts ON n.rowid = fts.rowid
+                    WHERE nodes_fts MATCH ?
+                    LIMIT ?
+                )
+            ''', (_like_prefix(prefix), prefix.replace('"', '""'), limit))
+        except sqlite3.OperationalError:
+            # If FTS5 query fails, fall back to LIKE search as search_records does
+            cursor.execute(f'''
+                {short_names_sql}
+                UNION ALL
+                SELECT * FROM (
+                    SELECT record_id FROM nodes
+                    WHERE searchable_content LIKE ? OR record_id LIKE ?
+                    LIMIT ?
+                )
+            ''', (_like_prefix(prefix), f'%{prefix}%', f'%{prefix}%', limit))
+    
+    # Deduplicate while keeping short names ahead of record IDs
+    return list(dict.fromkeys(row[0] for row in cursor.fetchall()))
+
+
+def completion_cache_get(key: str) -> Optional[List[str]]:
+    """
+    Get cached completions that have not yet expired.
+    
+    Args:
+        key: Cache key identifying the completer and the text typed so far
+        
+    Returns:
+        The cached completions, or None on a miss
+    """
+    init_database()
+    conn = get_connection()
+    row = conn.execute('''
+        SELECT value FROM completion_cache
+        WHERE key = ? AND expires_at >= CAST(strftime('%s', 'now') AS INTEGER)
+    ''', (key,)).fetchone()
+    
+    return json.loads(row[0]) if row else None
+
+
+def completion_cache_put(key: str, value: List[str], ttl: int) -> None:
+    """
+    Cache completions for ttl seconds.
+    
+    Args:
+        key: Cache key identifying the completer and the text typed so far
+        value: Completions to store
+        ttl: Number of seconds before the entry expires
+    """
+    init_database()
+    with transaction() as cursor:
+        cursor.execute('''
+            INSERT OR REPLACE INTO completion_cache (key, value, expires_at)
+            VALUES (?, ?, CAST(strftime('%s', 'now') AS INTEGER) + ?)
+        ''', (key, json.dumps(value), ttl))
+
+
+def get_distinct_attribute_types(prefix: str = "") -> List[str]:
     """
     Get all distinct attribute types from the database.
     
+    Args:
+        prefix: Only return types starting with this (case-insensitive)
+        
     Returns:
         List of distinct attribute types
     """
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
-        SELECT DISTINCT attr_type FROM attributes 
-        WHERE attr_type IS NOT NULL AND attr_type != ''
-        ORDER BY attr_type
-    ''')
+        SELECT DISTINCT type FROM attributes 
+        WHERE type != '' AND type LIKE ? ESCAPE '\\'
+        ORDER BY type
+    ''', (_like_prefix(prefix),))
     
     results = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return results
 
 
-def get_distinct_attribute_subjects() -> List[str]:
+def get_distinct_attribute_subjects(prefix: str = "") -> List[str]:
     """
     Get all distinct attribute subjects from the database.
     
+    Args:
+        prefix: Only return subjects starting with this (case-insensitive)
+        
     Returns:
         List of distinct attribute subjects
     """
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
         SELECT DISTINCT subject FROM attributes 
-        WHERE subject IS NOT NULL AND subject != ''
+        WHERE subject != '' AND subject LIKE ? ESCAPE '\\'
         ORDER BY subject
-    ''')
+    ''', (_like_prefix(prefix),))
     
     results = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return results
 
 
-def get_distinct_edge_types() -> List[str]:
+def get_distinct_edge_types(prefix: str = "") -> List[str]:
     """
     Get all distinct edge types from the database.
     
+    Args:
+        prefix: Only return edge types starting with this (case-insensitive)
+        
     Returns:
         List of distinct edge types
     """
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
     cursor.execute('''
         SELECT DISTINCT edge_type FROM edges 
-        WHERE edge_type IS NOT NULL AND edge_type != ''
+        WHERE edge_type != '' AND edge_type LIKE ? ESCAPE '\\'
         ORDER BY edge_type
-    ''')
+    ''', (_like_prefix(prefix),))
     
     results = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return results
 
 
@@ -962,7 +1321,7 @@ def get_recent_records(limit: int = 10) -> List[Dict]:
         List of recent records
     """
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
     # Get recent records from all tables
@@ -978,10 +1337,76 @@ def get_recent_records(limit: int = 10) -> List[Dict]:
         table_name, record_id, searchable_content, created_at = row
         results.extend(_get_record_data(cursor, table_name, record_id, searchable_content))
     
-    conn.close()
     return results
 
 
+def get_recent_record_ids(limit: int = 5, record_type: Optional[str] = None) -> List[str]:
+    """
+    Get the IDs of the most recently created records for completion suggestions.
+    
+    Args:
+        limit: Maximum number of IDs to return
+        record_type: Only include records of this type ('entity', 'attribute', 'file')
+        
+    Returns:
+        List of record IDs, newest first
+    """
+    init_database()
+    
+    if record_type is None:
+        sql = 'SELECT record_id FROM nodes ORDER BY created_at DESC LIMIT ?'
+        params = (limit,)
+    else:
+        table_name = RECORD_TYPE_TABLES.get(record_type)
+        if not table_name:
+            return []
+        sql = 'SELECT record_id FROM nodes WHERE table_name = ? ORDER BY created_at DESC LIMIT ?'
+        params = (table_name, limit)
+    
+    conn = get_connection()
+    return [row[0] for row in conn.execute(sql, params)]
+
+
+def get_record_ids_by_prefix(prefix: str, record_type: Optional[str] = None, limit: int = 10) -> List[str]:
+    """
+    Get record IDs starting with prefix (ignoring case) for completion suggestions.
+    
+    Args:
+        prefix: Text the IDs must start with
+        record_type: Only include records of this type ('entity', 'attribute', 'file')
+        limit: Maximum number of IDs to return
+        
+    Returns:
+        List of matching record IDs in ID order
+    """
+    init_database()
+    
+    # A plain prefix LIKE is answered by a range scan on idx_nodes_record_id_nocase;
+    # the unary + keeps the planner from preferring the table_name index instead
+    if record_type is None:
+        sql = '''
+            SELECT record_id FROM nodes
+            WHERE record_id LIKE ? ESCAPE '\\'
+            ORDER BY record_id COLLATE NOCASE
+            LIMIT ?
+        '''
+        params = (_like_prefix(prefix), limit)
+    else:
+        table_name = RECORD_TYPE_TABLES.get(record_type)
+        if not table_name:
+            return []
+        sql = '''
+            SELECT record_id FROM nodes
+            WHERE record_id LIKE ? ESCAPE '\\' AND +table_name = ?
+            ORDER BY record_id COLLATE NOCASE
+            LIMIT ?
+        '''
+        params = (_like_prefix(prefix), table_name, limit)
+    
+    conn = get_connection()
+    return [row[0] for row in conn.execute(sql, params)]
+
+
 def search_records_by_type(record_type: str, query: str = "", limit: int = 10) -> List[Dict]:
     """
     Search for records of a specific type.
@@ -995,18 +1420,14 @@ def search_records_by_type(record_type: str, query: str = "", limit: int = 10) -
         List of matching records
     """
     init_database()
-    conn = sqlite3.connect(_db_path)
-    cursor = conn.cursor()
-    
-    table_name = {
-        'entity': 'entities',
-        'attribute': 'attributes', 
-        'file': 'files'
-    }.get(record_type)
     
+    table_name = RECORD_TYPE_TABLES.get(record_type)
     if not table_name:
         return []
     
+    conn = get_connection()
+    cursor = conn.cursor()
+    
     if query:
         # Search with query
         cursor.execute(f'''
@@ -1014,6 +1435,7 @@ def search_records_by_type(record_type: str, query: str = "", limit: int = 10) -
             FROM nodes n
             JOIN nodes_fts fts ON n.rowid = fts.rowid
             WHERE n.table_name = ? AND nodes_fts MATCH ?
+              AND n.record_id IS NOT NULL AND n.record_id <> ''
             ORDER BY n.created_at DESC
             LIMIT ?
         ''', (table_name, query, limit))
@@ -1023,6 +1445,7 @@ def search_records_by_type(record_type: str, query: str = "", limit: int = 10) -
             SELECT n.id, n.table_name, n.record_id, n.searchable_content
             FROM nodes n
             WHERE n.table_name = ?
+              AND n.record_id IS NOT NULL AND n.record_id <> ''
             ORDER BY n.created_at DESC
             LIMIT ?
         ''', (table_name, limit))
@@ -1032,7 +1455,6 @@ def search_records_by_type(record_type: str, query: str = "", limit: int = 10) -
         node_id, table_name, record_id, searchable_content = row
         results.extend(_get_record_data(cursor, table_name, record_id, searchable_content))
     
-    conn.close()
     return results
 
 def _get_record_data(cursor, table_name: str, record_id: str, searchable_content: str) -> List[Dict]:
@@ -1098,43 +1520,41 @@ def _get_record_data(cursor, table_name: str, record_id: str, searchable_content
 def _get_short_name_tables() -> List[str]:
     """Helper function to get tables that have a `short_name` field."""
     init_database()
-    conn = sqlite3.connect(_db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%short_name%'
     ''')
     return [row[0] for row in cursor.fetchall()]
 
-def get_short_names(table: str) -> List[str]:
+def get_short_names(table: str, prefix: str = "") -> List[str]:
     """Helper function to get short names from a table."""
     init_database()
-    conn = sqlite3.connect(_db_path)
-    cursor = conn.cursor()
     
     # Validate table name to prevent SQL injection (whitelist approach)
-    valid_tables = ['entities', 'attributes', 'files']
-    if table not in valid_tables:
-        conn.close()
+    if table not in _VALID_TABLES:
         return []
     
+    conn = get_connection()
+    cursor = conn.cursor()
+    
     # Use string formatting for table name (safe after validation)
     cursor.execute(f'''
         SELECT DISTINCT short_name FROM {table}
-        WHERE short_name IS NOT NULL AND short_name != ''
-    ''')
+        WHERE short_name != '' AND short_name LIKE ? ESCAPE '\\'
+    ''', (_like_prefix(prefix),))
     
     results = [row[0] for row in cursor.fetchall()]
-    conn.close()
     return results
 
-def get_all_short_names() -> List[str]:
-    """Helper function to get all short names from all tables."""
+def get_all_short_names(prefix: str = "") -> List[str]:
+    """Helper function to get all short names (optionally starting with prefix) from all tables."""
     tables = _get_short_name_tables()
     all_short_names = []
     
     for table in tables:
-        short_names = get_short_names(table)
+        short_names = get_short_names(table, prefix)
         all_short_names.extend(short_names)
     
-    # Return unique short names
-    return list(set(all_short_names))
+    # Return unique short names, keeping a stable order between TAB presses
+    return list(dict.fromkeys(all_short_names))
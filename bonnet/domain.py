@@ -1,7 +1,9 @@
 """Domain layer that returns Pydantic models after database fetches."""
 
+import sys
+
 from ._models import ContextTree, Node, Edge, build_model_from_record
-from typing import Dict, List 
+from typing import Dict, List, Optional, Tuple
 from ._input_models import (
     SearchInput,
     SearchEntitiesInput,
@@ -14,6 +16,13 @@ from ._input_models import (
 from . import database
 
 
+def _generate_id(prefix: str) -> str:
+    """Generate the next simple ID for prefix, e.g. "T1" then "T2" for prefix "T"."""
+    # Get next available number for the prefix
+    next_number = database.get_next_id_number(prefix)
+    return f"{prefix}{next_number}"
+
+
 def generate_topic_id() -> str:
     """
     Generate a simple topic ID with prefix and number.
@@ -21,9 +30,7 @@ def generate_topic_id() -> str:
     Returns:
         A simple ID like "T1", "T2", "T3", etc.
     """
-    # Get next available number for topic prefix
-    next_number = database.get_next_id_number("T")
-    return f"T{next_number}"
+    return _generate_id("T")
 
 
 def generate_file_id() -> str:
@@ -33,9 +40,7 @@ def generate_file_id() -> str:
     Returns:
         A simple ID like "F1", "F2", "F3", etc.
     """
-    # Get next available number for file prefix
-    next_number = database.get_next_id_number("F")
-    return f"F{next_number}"
+    return _generate_id("F")
 
 
 def search(input: SearchInput) -> ContextTree:
@@ -54,13 +59,25 @@ def search(input: SearchInput) -> ContextTree:
         input.include_related, 
         input.max_depth
     )
+    return _build_context_tree(graph_structure)
+
+
+def _build_context_tree(graph_structure: List[Dict]) -> ContextTree:
+    """
+    Convert a graph structure from the database layer into a ContextTree.
     
+    Args:
+        graph_structure: Root node structures as returned by database.get_graph_structure
+        
+    Returns:
+        ContextTree for the single root, or a 'root' tree wrapping several (or none)
+    """
     # Convert graph structure to ContextTree
     def build_context_tree(node_data: Dict) -> ContextTree:
         # Create the node model
         node = Node(
             id=node_data['node']['id'],
-            table_name=node_data['node']['table_name'],
+            table_name=sys.intern(node_data['node']['table_name']),
             record_id=node_data['node']['record_id'],
             searchable_content=node_data['node']['searchable_content']
         )
@@ -80,7 +97,7 @@ def search(input: SearchInput) -> ContextTree:
                 id=edge_data['id'],
                 from_node_id=edge_data['from_node_id'],
                 to_node_id=edge_data['to_node_id'],
-                edge_type=edge_data['edge_type'],
+                edge_type=sys.intern(edge_data['edge_type']),
                 searchable_content=edge_data['searchable_content']
             )
             edges.append(edge)
@@ -192,9 +209,15 @@ def search_entities(input: SearchEntitiesInput) -> ContextTree:
     Returns:
         ContextTree containing matching entities and their context
     """
+    # An exact entity ID needs no full-text search; build its context directly
+    entity_node_id = database.get_entity_node_id(input.query)
+    if entity_node_id:
+        return _build_context_tree(database.get_graph_structure_for_nodes([entity_node_id], True, 10))
+    
     # Use the existing search function with default parameters
     # Use max_depth=10 to include related entities and their attributes at multiple levels
-    search_input = SearchInput(query=input.query, include_related=True, max_depth=10)
+    # The query was already validated by SearchEntitiesInput, so skip re-validation
+    search_input = SearchInput.model_construct(query=input.query, include_related=True, max_depth=10)
     return search(search_input)
 
 
@@ -260,14 +283,8 @@ def link(input: LinkInput) -> str:
         Edge ID if successful
     """
     # Map record types to table names
-    type_to_table = {
-        'entity': 'entities',
-        'file': 'files',
-        'attribute': 'attributes'
-    }
-    
-    from_table = type_to_table.get(input.from_type)
-    to_table = type_to_table.get(input.to_type)
+    from_table = database.RECORD_TYPE_TABLES.get(input.from_type)
+    to_table = database.RECORD_TYPE_TABLES.get(input.to_type)
     
     if not from_table:
         raise ValueError(f"Unknown record type: {input.from_type}")
@@ -284,15 +301,68 @@ def link(input: LinkInput) -> str:
     )
 
 
-def search_records(query: str) -> List[Dict]:
+def search_records(query: str, limit: Optional[int] = None) -> List[Dict]:
     """
     Search for records by content or ID.
     
     Args:
         query: Search query string or record ID
+        limit: Maximum number of records to return (all matches if None)
         
     Returns:
         List of matching records
     """
-    return database.search_records(query)
+    return database.search_records(query, limit)
+
+
+def search_records_page(query: str, limit: int) -> Tuple[List[Dict], int]:
+    """
+    Search for records by content or ID, returning one page and the total match count.
+    
+    Args:
+        query: Search query string or record ID
+        limit: Maximum number of records to return
+        
+    Returns:
+        Tuple of (matching records, up to limit; total number of matches)
+    """
+    return database.search_records_page(query, limit)
+
+
+def search_records_batch(queries: List[str]) -> Dict[str, List[Dict]]:
+    """
+    Search for records matching each of several queries at once.
+    
+    Args:
+        queries: Search query strings
+        
+    Returns:
+        Mapping of each query to its list of matching records
+    """
+    return database.search_records_batch(queries)
+
+
+def get_record_by_id(record_id: str) -> Optional[Dict]:
+    """
+    Get a record by its exact ID.
+    
+    Args:
+        record_id: The record ID
+        
+    Returns:
+        The matching record if exactly one record has this ID, None otherwise
+    """
+    return database.get_record_by_id(record_id)
+
 
+def get_records_by_ids(record_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Get several records by their exact IDs in one lookup.
+    
+    Args:
+        record_ids: The record IDs
+        
+    Returns:
+        Mapping of each ID held by exactly one record to that record
+    """
+    return database.get_records_by_ids(record_ids)
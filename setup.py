@@ -28,7 +28,6 @@ setup(
     python_requires=">=3.7",
     install_requires=[
         "click>=8.0.0",
-        "python-dateutil>=2.8.0",
         "pydantic>=2.0.0",
     ],
     entry_points={